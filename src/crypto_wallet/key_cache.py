@@ -0,0 +1,95 @@
+# -*- coding: UTF-8 -*-
+import hashlib
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import Optional, Iterator
+
+
+class KeyCache:
+    """
+    Persistent cache of master private keys derived from passphrases.
+
+    Keys are stored by wallet name, network and passphrase digest, so a wrong
+    passphrase never matches a cached key. Database file is created on first use
+    with 0600 permissions.
+
+    Attributes
+        path: str - SQLite database file path
+
+    Methods
+        get
+
+        set
+
+        delete
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path: str = os.path.expanduser(path)
+        self._initialized: bool = False
+
+    def _initialize(self) -> None:
+        """Creates database file readable by owner only and keys table"""
+
+        directory: str = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        os.close(os.open(self._path, os.O_CREAT | os.O_WRONLY, 0o600))
+        os.chmod(self._path, 0o600)
+        connection: sqlite3.Connection = sqlite3.connect(self._path)
+        try:
+            with connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS keys ("
+                    "name TEXT NOT NULL, network TEXT NOT NULL, digest TEXT NOT NULL, "
+                    "private_hex TEXT NOT NULL, PRIMARY KEY (name, network))"
+                )
+        finally:
+            connection.close()
+        self._initialized = True
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        if not self._initialized:
+            self._initialize()
+        connection: sqlite3.Connection = sqlite3.connect(self._path)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _digest(passphrase: str) -> str:
+        return hashlib.sha256(passphrase.encode('utf-8')).hexdigest()
+
+    def get(self, name: str, network: str, passphrase: str) -> Optional[str]:
+        """Returns cached private key hex or None"""
+
+        with self._connect() as connection:
+            row: Optional[tuple] = connection.execute(
+                "SELECT private_hex FROM keys WHERE name = ? AND network = ? AND digest = ?",
+                (name, network, self._digest(passphrase))
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, name: str, network: str, passphrase: str, private_hex: str) -> None:
+        """Saves private key hex for wallet"""
+
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO keys (name, network, digest, private_hex) "
+                "VALUES (?, ?, ?, ?)",
+                (name, network, self._digest(passphrase), private_hex)
+            )
+
+    def delete(self, name: str) -> None:
+        """Removes all cached keys of wallet"""
+
+        with self._connect() as connection:
+            connection.execute("DELETE FROM keys WHERE name = ?", (name,))
+
+    @property
+    def path(self) -> str:
+        return self._path
@@ -1,31 +1,105 @@
 # -*- coding: UTF-8 -*-
-from decimal import Decimal, getcontext
-from functools import wraps
-from typing import Optional, Callable, Any
-
-import bitcoinlib
-from bitcoinlib.wallets import Wallet, wallet_delete, WalletError, WalletTransaction
-from bitcoinlib.mnemonic import Mnemonic
-from bitcoinlib.keys import HDKey
+import asyncio
+import importlib
+import time
+from decimal import Decimal, getcontext, localcontext, ROUND_DOWN
+from functools import wraps, lru_cache, partial
+from typing import Optional, Callable, Any, List, TYPE_CHECKING
+
 from myloguru.my_loguru import get_logger
 from crypto_wallet.exceptions import WalletExists, PassphraseError
+from crypto_wallet.key_cache import KeyCache
+
+if TYPE_CHECKING:
+    from bitcoinlib.wallets import Wallet, WalletTransaction
+    from bitcoinlib.keys import HDKey
 
 getcontext().prec = 5
 logger = get_logger(level=20)
+NETWORK_SYMBOLS: dict = {'litecoin': 'LTC', 'bitcoin': 'BTC'}
+SATOSHI: Decimal = Decimal("1e-8")
+
+# bitcoinlib opens its database on import, so it is imported on first use only
+_BITCOINLIB_NAMES: dict = {
+    'Wallet': 'bitcoinlib.wallets',
+    'WalletError': 'bitcoinlib.wallets',
+    'WalletTransaction': 'bitcoinlib.wallets',
+    'wallet_delete': 'bitcoinlib.wallets',
+    'Mnemonic': 'bitcoinlib.mnemonic',
+    'HDKey': 'bitcoinlib.keys',
+}
+
+
+def __getattr__(name: str) -> Any:
+    """Resolves bitcoinlib names imported from this module lazily"""
+
+    module_name: Optional[str] = _BITCOINLIB_NAMES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module_name), name)
+
+
+@lru_cache(maxsize=128)
+def _passphrase_to_seed(passphrase: str) -> bytes:
+    """Returns BIP39 seed for passphrase.
+
+    bitcoinlib validates the mnemonic and runs PBKDF2-HMAC-SHA512 with 2048
+    iterations through hashlib, which is the dominant cost of opening a wallet.
+    Seed is cached so master and account key derivations share one KDF run.
+    """
+
+    from bitcoinlib.mnemonic import Mnemonic
+
+    return Mnemonic().to_seed(passphrase)
+
+
+@lru_cache(maxsize=128)
+def _derive_private_hex(passphrase: str, network: str) -> str:
+    """Returns master private key hex derived from passphrase.
+
+    Results are cached so repeated loads skip PBKDF2 and BIP32 derivation.
+    """
+
+    from bitcoinlib.keys import HDKey
+
+    return HDKey.from_seed(_passphrase_to_seed(passphrase), network=network).private_hex
+
+
+@lru_cache(maxsize=128)
+def _derive_account_key(passphrase: str, network: str) -> 'HDKey':
+    """Returns account level public key derived from passphrase.
+
+    Address keys are non-hardened children of it, so they are cheap to compute.
+    """
+
+    from bitcoinlib.keys import HDKey
+
+    hd_key: 'HDKey' = HDKey.from_seed(_passphrase_to_seed(passphrase), network=network)
+    return hd_key.public_master()
+
+
+@lru_cache(maxsize=None)
+def _get_key_cache(path: str) -> KeyCache:
+    """Returns KeyCache shared by all wallets using the same file"""
+
+    return KeyCache(path)
+
+
+async def _run_in_thread(func: Callable, *args, **kwargs) -> Any:
+    """Runs blocking bitcoinlib call in default executor so event loop is not blocked"""
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, partial(func, *args, **kwargs))
 
 
 def load_wallet_data(func: Callable) -> Callable:
     """Decorator for create wallet inside instance if wallet is not exists"""
 
     @wraps(func)
-    async def wrapper(*args, **kwargs) -> Any:
-        name: str = func.__name__
-        if args and hasattr(args[0].__class__, name):
-            wallet: 'Wallet' = getattr(args[0], "_wallet")
-            if not wallet:
-                await args[0].load_data()
-            return await func(*args, **kwargs)
-        return await func(*args, **kwargs)
+    async def wrapper(self: 'CryptoWallet', *args, **kwargs) -> Any:
+        if self._wallet is None:
+            await self.load_data()
+        return await func(self, *args, **kwargs)
 
     return wrapper
 
@@ -49,14 +123,20 @@ class CryptoWallet:
         network: str = 'litecoin'
             Crypto network
 
-        fee: Decimal = Decimal(0.0015)
-            Fee for transfer
+        fee: Optional[Decimal] = None
+            Fee for transfer, DEFAULT_FEE if not set
+
+        key_cache_path: str = ''
+            SQLite file for derived keys, keeps them across restarts. Disabled if empty.
+            File contains private keys, keep it as protected as bitcoinlib database.
 
     Methods
         get_wallet
 
         get_wallet_address
 
+        derive_addresses
+
         get_wallet_balance
 
         get_wallet_balance_str
@@ -66,30 +146,72 @@ class CryptoWallet:
         info
     """
 
+    DEFAULT_FEE: Decimal = Decimal("0.0015")
+    __slots__ = (
+        '_network', '_network_symbol', '_wallet_name', '_passphrase', '_wallet', '_wallet_id',
+        '_address', '_snapshot', '_send_lock', '_wallet_lock', '_scan_ttl', '_main_wallet',
+        '_fee', '_key_cache',
+    )
+
     def __init__(
             self,
             wallet_name: str,
             passphrase: str = '',
             main_wallet: str = '',
             network: str = 'litecoin',
-            fee: Decimal = Decimal(0.0015),
+            fee: Optional[Decimal] = None,
+            key_cache_path: str = '',
     ) -> None:
         self._network = network
+        self._network_symbol: str = NETWORK_SYMBOLS.get(network, network.upper())
         self._wallet_name: str = wallet_name
         self._passphrase: str = passphrase
         self._wallet: Optional['Wallet'] = None
         self._wallet_id: int = 0
+        self._address: Optional[str] = None
+        self._snapshot: dict = {}
+        self._send_lock: Optional[asyncio.Lock] = None
+        self._wallet_lock: Optional[asyncio.Lock] = None
+        self._scan_ttl: float = 30.0
         self._main_wallet: str = main_wallet
-        self._fee: Decimal = fee
+        self._fee: Decimal = self.DEFAULT_FEE if fee is None else Decimal(fee)
+        self._key_cache: Optional[KeyCache] = (
+            _get_key_cache(key_cache_path) if key_cache_path else None)
 
     async def get_wallet(self) -> 'CryptoWallet':
         return await self._get_or_create_wallet()
 
+    @staticmethod
+    def derive_addresses(
+            passphrase: str, count: int, network: str = 'litecoin', change: int = 0
+    ) -> List[str]:
+        """Returns first count addresses of the passphrase account without creating wallets.
+
+        Account key is derived once, every address needs only one child key derivation.
+
+        :param passphrase: Wallet passphrase
+        :param count: Number of addresses
+        :param network: Crypto network
+        :param change: 0 for receiving addresses, 1 for change addresses
+        :return: List of addresses
+        """
+
+        if not passphrase:
+            raise PassphraseError
+        account_key: 'HDKey' = _derive_account_key(passphrase, network)
+        return [
+            account_key.subkey_for_path(f"{change}/{index}").address()
+            for index in range(count)
+        ]
+
     async def _create_new_wallet(self) -> 'CryptoWallet':
-        passphrase: str = Mnemonic().generate()
+        from bitcoinlib.wallets import Wallet, WalletError
+        from bitcoinlib.mnemonic import Mnemonic
+
+        passphrase: str = self._passphrase or Mnemonic().generate()
         try:
-            self._wallet: 'Wallet' = Wallet.create(
-                self._wallet_name, keys=self._passphrase, network=self._network)
+            self._wallet: 'Wallet' = await _run_in_thread(
+                Wallet.create, self._wallet_name, keys=passphrase, network=self._network)
             logger.debug(f"Wallet created with name: [{self._wallet_name}]")
             self._passphrase = passphrase
         except WalletError:
@@ -98,7 +220,7 @@ class CryptoWallet:
         return self
 
     def _get_fee(self) -> 'Decimal':
-        return self.fee
+        return self._fee
 
     async def load_data(self) -> 'CryptoWallet':
         """Returns CryptoWallet instance contains Wallet data loaded from passphrase
@@ -109,6 +231,7 @@ class CryptoWallet:
         wallet: 'Wallet' = await self._get_wallet_from_passphrase()
         self._wallet = wallet
         self._wallet_id = wallet.wallet_id
+        self._snapshot = {}
         logger.debug(f"Wallet with name {self._wallet_name}\tWallet_id: {self._wallet_id}")
 
         return self
@@ -119,26 +242,92 @@ class CryptoWallet:
             return self
         return await self.load_data()
 
-    async def _get_wallet_from_passphrase(self) -> Wallet:
+    async def _get_wallet_from_passphrase(self) -> 'Wallet':
+        from bitcoinlib.wallets import Wallet, WalletError
+
         if not self._passphrase:
             raise PassphraseError
+        private_hex: Optional[str] = None
+        if self._key_cache:
+            private_hex = await _run_in_thread(
+                self._key_cache.get, self._wallet_name, self._network, self._passphrase)
+        cached: bool = private_hex is not None
         try:
-            hd_key: 'HDKey' = HDKey.from_passphrase(
-                passphrase=self._passphrase, network=self._network)
-            return Wallet(wallet=self._wallet_name, main_key_object=hd_key.private_hex)
+            if not cached:
+                private_hex = _derive_private_hex(self._passphrase, self._network)
+            wallet: 'Wallet' = Wallet(wallet=self._wallet_name, main_key_object=private_hex)
         except WalletError as err:
             logger.error(f"Passphrase error: {err}")
             raise PassphraseError
+        if self._key_cache and not cached:
+            await _run_in_thread(
+                self._key_cache.set,
+                self._wallet_name, self._network, self._passphrase, private_hex)
+        return wallet
 
-    @load_wallet_data
-    async def get_wallet_address(self) -> str:
-        """Returns wallet address"""
+    async def _get_snapshot(self) -> dict:
+        """Returns scanned balance data, wallet is rescanned if data is older than scan TTL
+
+        {
+            "balance": wallet_balance, - int
+
+            "balance_str": wallet_balance_str, - str
+
+            "ts": scan_time, - float
+        }
+        """
+
+        if self._is_snapshot_fresh():
+            return self._snapshot
+        async with self._get_wallet_lock():
+            # another coroutine may have scanned while this one waited for the lock
+            if self._is_snapshot_fresh():
+                return self._snapshot
+            now: float = time.monotonic()
+            await _run_in_thread(self._wallet.scan)
+            # get_key() returns first unused key, scan may have marked cached one as used
+            self._address = None
+            self._snapshot = {
+                "balance": self._wallet.balance(network=self._network),
+                "balance_str": self._wallet.balance(network=self._network, as_string=True),
+                "ts": now,
+            }
+        return self._snapshot
+
+    def _is_snapshot_fresh(self) -> bool:
+        return bool(self._snapshot) and time.monotonic() - self._snapshot["ts"] < self._scan_ttl
+
+    def _get_wallet_lock(self) -> asyncio.Lock:
+        """Returns lock serializing all bitcoinlib wallet access.
+
+        Wallet shares one SQLAlchemy session, which is not thread safe,
+        and scan and send_to use it from executor threads.
+        """
+
+        if self._wallet_lock is None:
+            self._wallet_lock = asyncio.Lock()
+        return self._wallet_lock
+
+    def _get_address(self) -> str:
+        """Returns cached wallet address, caller must hold wallet lock"""
 
+        if self._address:
+            return self._address
         address = self._wallet.get_key().address
+        self._address = address
         logger.debug(f"Wallet with name: {self._wallet_name}\tAddress: {address}")
 
         return address
 
+    @load_wallet_data
+    async def get_wallet_address(self) -> str:
+        """Returns wallet address"""
+
+        if self._address:
+            return self._address
+        async with self._get_wallet_lock():
+            return self._get_address()
+
     @load_wallet_data
     async def get_wallet_balance(self) -> 'Decimal':
         """Returns balance in integer format
@@ -146,8 +335,8 @@ class CryptoWallet:
         Example: 109531
         """
 
-        self._wallet.scan()
-        balance: 'Decimal' = Decimal(self._wallet.balance(network=self._network))
+        snapshot: dict = await self._get_snapshot()
+        balance: 'Decimal' = Decimal(snapshot["balance"])
         logger.debug(f"Wallet with name: {self._wallet_name}\tBalance: {balance}")
 
         return balance
@@ -158,8 +347,8 @@ class CryptoWallet:
 
         Example: '0.0001235 LTC'
         """
-        self._wallet.scan()
-        balance: str = self._wallet.balance(network=self._network, as_string=True)
+        snapshot: dict = await self._get_snapshot()
+        balance: str = snapshot["balance_str"]
 
         logger.debug(f"Wallet with name: {self._wallet_name}\tBalance: {balance}")
         return balance
@@ -189,17 +378,22 @@ class CryptoWallet:
         :return: Dictionary wallet data
         """
 
-        wallet_data: dict = self._wallet.as_dict()
-        address: str = await self.get_wallet_address()
-        data_for_save = {
-            "wallet_id": wallet_data.get("wallet_id"),
-            "name": wallet_data.get("name"),
-            "passphrase": self._passphrase,
-            "address": address,
-            "main_network": wallet_data.get("main_network"),
-            "main_balance": wallet_data.get("main_balance"),
-            "main_balance_str": wallet_data.get("main_balance_str")
-        }
+        wallet: 'Wallet' = self._wallet
+        async with self._get_wallet_lock():
+            address: str = self._get_address()
+            snapshot: dict = self._snapshot or {
+                "balance": wallet.balance(network=self._network),
+                "balance_str": wallet.balance(network=self._network, as_string=True),
+            }
+            data_for_save = {
+                "wallet_id": wallet.wallet_id,
+                "name": wallet.name,
+                "passphrase": self._passphrase,
+                "address": address,
+                "main_network": wallet.network.name,
+                "main_balance": snapshot["balance"],
+                "main_balance_str": snapshot["balance_str"]
+            }
         return data_for_save
 
     async def _cost_with_fee(self, amount: str) -> str:
@@ -207,49 +401,102 @@ class CryptoWallet:
 
         Example: '0.0001235 LTC'
         """
+        if not self._fee:
+            return amount
         cost, currency = amount.split()
-        cost: 'Decimal' = Decimal(cost) - self._get_fee()
+        return self._format_cost(self._subtract_fee(Decimal(cost)), currency)
+
+    async def _balance_with_fee(self) -> str:
+        """Returns whole wallet balance minus fee in string format.
+
+        Example: '0.00012350 LTC'
+        """
+        snapshot: dict = await self._get_snapshot()
+        if not self._fee:
+            return snapshot["balance_str"]
+        satoshi: int = snapshot["balance"]
+        cost: 'Decimal' = self._subtract_fee(Decimal(f"{satoshi}e-8"))
+        return self._format_cost(cost, self._network_symbol)
+
+    def _subtract_fee(self, cost: 'Decimal') -> 'Decimal':
+        """Returns cost minus fee rounded down to satoshi"""
+
+        with localcontext() as context:
+            # module context precision would round the amount, possibly above the balance
+            context.prec = 28
+            return (cost - self._get_fee()).quantize(SATOSHI, rounding=ROUND_DOWN)
+
+    @staticmethod
+    def _format_cost(cost: 'Decimal', currency: str) -> str:
         if cost < 0:
             cost = Decimal(0)
-        cost: str = str(cost) + ' ' + currency
+        return f"{cost:.8f} {currency}"
+
+    def _get_send_lock(self) -> asyncio.Lock:
+        """Returns lock serializing transfers, created inside running event loop"""
 
-        return cost
+        if self._send_lock is None:
+            self._send_lock = asyncio.Lock()
+        return self._send_lock
 
     @load_wallet_data
-    async def send_money(self, amount: str, address: str) -> dict:
-        """Sends money to address, by default all money will be sent
+    async def send_money(self, amount: str = '', address: str = '') -> dict:
+        """Sends money to address, by default all money will be sent to main wallet
 
         :param amount: String format. For example: '0.0015544 LTC'
-        :param address: String target address
+        :param address: String target address, main wallet if empty
         :return: bool: Success result
+        :raises ValueError: if neither address nor main wallet is set
         """
-
-        amount: str = await self._cost_with_fee(amount)
-        try:
-            transaction: 'WalletTransaction' = await self.__send_money(
-                amount=amount, address=address)
-            result: dict = transaction.as_dict()
-            logger.info(f"Status: {transaction.status}"
-                        f"\nResult: {result}")
-
-            return result
-        except WalletError as err:
-            logger.error(
-                f"Send money error: "
-                f"\nWallet name: {self._wallet_name}\tSending: {amount} to {self._main_wallet}"
-                f"\nError: {err}")
-        except bitcoinlib.encoding.EncodingError as err:
-            logger.error(f"MAIN WALLET ERROR: {err}")
-        except bitcoinlib.transactions.TransactionError as err:
-            logger.error(f"Transaction ERROR: {err}")
-
-        return {}
-
-    async def __send_money(self, amount: str, address: str) -> WalletTransaction:
+        from bitcoinlib.wallets import WalletError
+        from bitcoinlib.encoding import EncodingError
+        from bitcoinlib.transactions import TransactionError
+
+        address = address or self._main_wallet
+        if not address:
+            raise ValueError("Target address is not set, pass address or set main_wallet")
+        async with self._get_send_lock():
+            if amount:
+                amount: str = await self._cost_with_fee(amount)
+            else:
+                amount: str = await self._balance_with_fee()
+            try:
+                transaction: 'WalletTransaction' = await self.__send_money(
+                    amount=amount, address=address)
+                result: dict = transaction.as_dict()
+                self._snapshot = {}
+                self._address = None
+                logger.info(f"Status: {transaction.status}"
+                            f"\nResult: {result}")
+
+                return result
+            except WalletError as err:
+                logger.error(
+                    f"Send money error: "
+                    f"\nWallet name: {self._wallet_name}\tSending: {amount} to {self._main_wallet}"
+                    f"\nError: {err}")
+            except EncodingError as err:
+                logger.error(f"MAIN WALLET ERROR: {err}")
+            except TransactionError as err:
+                logger.error(f"Transaction ERROR: {err}")
+
+            return {}
+
+    async def __send_money(self, amount: str, address: str) -> 'WalletTransaction':
         logger.debug(f"Wallet name: {self._wallet_name}\tSending: {amount} to {self._main_wallet}")
-        return self._wallet.send_to(address, amount, offline=False)
+        async with self._get_wallet_lock():
+            return await _run_in_thread(self._wallet.send_to, address, amount, offline=False)
 
     async def delete_wallet(self):
+        from bitcoinlib.wallets import wallet_delete, WalletError
+
+        _passphrase_to_seed.cache_clear()
+        _derive_private_hex.cache_clear()
+        _derive_account_key.cache_clear()
+        self._address = None
+        self._snapshot = {}
+        if self._key_cache:
+            await _run_in_thread(self._key_cache.delete, self._wallet_name)
         try:
             if wallet_delete(self._wallet_name):
                 logger.debug(f"Wallet name: {self._wallet_name} deleted")
@@ -268,7 +515,7 @@ class CryptoWallet:
 
     @property
     def fee(self) -> Decimal:
-        return Decimal(self._fee)
+        return self._fee
 
     @property
     def passphrase(self) -> str:
@@ -24,8 +24,7 @@ def main_wallet() -> str:
 def load_passphrase(wallet_test_name):
     file_name: str = f"{wallet_test_name}.txt"
     if not os.path.exists(file_name):
-        with open(file_name, 'w', encoding='utf-8') as f:
-            f.write('')
-    with open(file_name) as f:
-        passphrase = f.read()
-    return passphrase
+        open(file_name, 'w', encoding='utf-8').close()
+        return ''
+    with open(file_name, encoding='utf-8') as f:
+        return f.read()
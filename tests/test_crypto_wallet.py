@@ -39,12 +39,22 @@ async def test_send_money_zero_balance_error(wallet_for_test, main_wallet):
     assert not await wallet_for_test.send_money(amount=balance_str, address=main_wallet)
 
 
+async def test_send_money_without_address_error(wallet_for_test):
+    with pytest.raises(ValueError):
+        await wallet_for_test.send_money()
+
+
+async def test_send_whole_balance_zero_balance_error(wallet_for_test, main_wallet):
+    wallet_for_test.main_wallet = main_wallet
+    assert not await wallet_for_test.send_money()
+
+
 async def test_get_wallet_from_passphrase(wallet_for_test, wallet_test_name, load_passphrase):
     wallet: 'CryptoWallet' = await wallet_for_test.get_wallet()
     assert wallet.wallet.name == wallet_test_name
 
 
-@pytest.mark.parametrize('network, fee', [("litecoin", Decimal(0.0015)),
+@pytest.mark.parametrize('network, fee', [("litecoin", Decimal("0.0015")),
                                           ])
 async def test_get_fee(network, fee, wallet_for_test):
     wallet_for_test._network = network
@@ -76,4 +86,6 @@ async def test_delete_wallet_not_exists(wallet_for_test):
 
 
 def test_delete_file(wallet_test_name):
-    assert os.system(f"rm {wallet_test_name}.txt") == 0
+    file_name: str = f"{wallet_test_name}.txt"
+    os.unlink(file_name)
+    assert not os.path.exists(file_name)
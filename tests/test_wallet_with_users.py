@@ -1,3 +1,6 @@
+import os
+
+from crypto_wallet.key_cache import KeyCache
 from crypto_wallet.wallet import CryptoWallet, wallet_delete
 
 
@@ -10,3 +13,39 @@ async def test_get_address_for_new_user():
         pass
     wallet: 'CryptoWallet' = await CryptoWallet(wallet_name=wallet_name).get_wallet()
     assert await CryptoWallet(wallet_name=wallet_name, passphrase=wallet.passphrase).info()
+
+
+async def test_derive_addresses_for_new_users():
+    telegram_ids: list = ['1234567891', '1234567892']
+    wallet_names: list = [f"w_{telegram_id}" for telegram_id in telegram_ids]
+    for wallet_name in wallet_names:
+        try:
+            wallet_delete(wallet_name)
+        except Exception:
+            pass
+    for wallet_name in wallet_names:
+        wallet: 'CryptoWallet' = await CryptoWallet(wallet_name=wallet_name).get_wallet()
+        addresses: list = CryptoWallet.derive_addresses(wallet.passphrase, count=3)
+        assert len(set(addresses)) == 3
+        assert addresses[0] == await wallet.get_wallet_address()
+        assert await wallet.delete_wallet() is True
+
+
+async def test_load_wallet_with_key_cache(tmp_path):
+    wallet_name: str = "w_1234567893"
+    key_cache_path: str = str(tmp_path / "keycache.sqlite")
+    try:
+        wallet_delete(wallet_name)
+    except Exception:
+        pass
+    wallet: 'CryptoWallet' = await CryptoWallet(wallet_name=wallet_name).get_wallet()
+    for _ in range(2):
+        loaded: 'CryptoWallet' = await CryptoWallet(
+            wallet_name=wallet_name, passphrase=wallet.passphrase, key_cache_path=key_cache_path
+        ).load_data()
+        assert loaded.wallet.name == wallet_name
+        key_cache: 'KeyCache' = KeyCache(key_cache_path)
+        assert key_cache.get(wallet_name, 'litecoin', wallet.passphrase)
+    assert os.stat(key_cache_path).st_mode & 0o777 == 0o600
+    assert await loaded.delete_wallet() is True
+    assert key_cache.get(wallet_name, 'litecoin', wallet.passphrase) is None